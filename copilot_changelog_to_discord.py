@@ -1,24 +1,54 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
-import json
+import functools
+import hashlib
+import itertools
 import os
 import re
 import sys
-from collections.abc import Iterable, Sequence
+import threading
+import time
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import Any, TypedDict
+from urllib.parse import urlsplit
 
 # feedparser will show up as 'could not be resolved' in some IDEs unless you have the venv set as your interpreter
 import feedparser
+import orjson
 import requests
 from bs4 import BeautifulSoup
-from dateutil import parser as dateparser
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    # Optional C-backed HTML parser; BeautifulSoup is used when it's not installed
+    from selectolax.lexbor import LexborHTMLParser
+
+    _HAS_SELECTOLAX = True
+except ImportError:
+    _HAS_SELECTOLAX = False
 
 FEED_URL = "https://github.blog/changelog/feed/"
-STATE_FILE = "seen.json"
+STATE_FILE = "seen.txt"
+# Older releases kept state as a JSON list; it is read until STATE_FILE exists
+LEGACY_STATE_FILE = "seen.json"
+# Once the state file grows past STATE_COMPACT_BYTES it is trimmed to the newest MAX_SEEN_IDS ids
+MAX_SEEN_IDS = 10_000
+STATE_COMPACT_BYTES = 1_000_000
+# HTTP validators (ETag / Last-Modified) from the last fully processed feed fetch
+VALIDATORS_FILE = "etag.json"
+LLM_CACHE_FILE = os.environ.get("LLM_CACHE_FILE", "llm_cache.json")
+# Only the most recently used responses are kept when the LLM cache is written
+LLM_CACHE_MAX_ENTRIES = 500
+# Bump when prompts change so cached LLM responses are not reused
+PROMPT_VERSION = "1"
 MAX_ITEMS_PER_RUN = 5
+FEED_TIMEOUT = 20
 
 DISCORD_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL")
 DISCORD_THREAD_ID = os.environ.get("DISCORD_THREAD_ID")
@@ -32,10 +62,57 @@ GITHUB_MODELS_API_URL = os.environ.get(
 # Forum posting mode: per-item (default), auto, single, off
 DISCORD_FORUM_MODE = os.environ.get("DISCORD_FORUM_MODE", "per-item").strip().lower()
 SUMMARY_TIMEOUT = float(os.environ.get("SUMMARY_HTTP_TIMEOUT", "20"))
+# Upper bound on concurrent LLM requests (keeps us polite with API rate limits)
+LLM_MAX_CONCURRENCY = max(1, int(os.environ.get("LLM_MAX_CONCURRENCY", "8")))
 FORCE_POST = os.environ.get("FORCE_POST", "").strip() not in ("", "0", "false", "False")
 DRY_RUN = os.environ.get("DRY_RUN", "").strip() not in ("", "0", "false", "False")
 SUMMARY_DEBUG = os.environ.get("SUMMARY_DEBUG", "").strip() not in ("", "0", "false", "False")
 
+GITHUB_MODELS_HEADERS = {"X-GitHub-Api-Version": "2024-07-01"}
+OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
+
+SUMMARY_SYSTEM_PROMPT = "You are a concise release note summarizer."
+OPENAI_SUMMARY_SYSTEM_PROMPT = (
+    "You are a concise release note summarizer. You will write direct summaries of the RSS feed content "
+    "without extra information. Omit text such as 'Copilot coding agent is our asynchronous, autonomous "
+    "background agent.'."
+)
+TITLE_SYSTEM_PROMPT = "You are a helpful assistant that writes brief titles."
+
+
+def _build_session() -> requests.Session:
+    """Shared HTTP session so LLM and Discord calls reuse pooled TCP/TLS connections.
+
+    Rate limiting (429) is retried with exponential backoff at the adapter level; 5xx
+    gateway errors only for the feed and LLM endpoints. Read timeouts are not retried.
+    """
+    session = requests.Session()
+    # A webhook POST that failed with a 5xx may still have been delivered, so by default
+    # (Discord and any of its ptb/canary hosts) only rate limiting is retried
+    retry = Retry(
+        total=3,
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=(429,),
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False,
+    )
+    session.mount("https://", HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=20))
+    # Feed reads and LLM completions are safe to repeat, so they also retry gateway errors.
+    # An exhausted model quota can answer with an hours-long Retry-After; ignore it and
+    # keep to the short backoff so the caller falls back instead of stalling the run.
+    gateway_retry = retry.new(status_forcelist=(429, 502, 503, 504), respect_retry_after_header=False)
+    for url in (FEED_URL, GITHUB_MODELS_API_URL, OPENAI_API_URL):
+        parts = urlsplit(url)
+        session.mount(
+            f"{parts.scheme}://{parts.netloc}/",
+            HTTPAdapter(max_retries=gateway_retry, pool_connections=1, pool_maxsize=20),
+        )
+    return session
+
+
+SESSION = _build_session()
+
 
 class EntryDict(TypedDict, total=False):
     id: str
@@ -46,6 +123,8 @@ class EntryDict(TypedDict, total=False):
     category: str
     published: str
     published_parsed: Any
+    # Memoized strip_html(summary); see _cleaned_summary
+    _clean_summary: str
 
 
 @dataclass
@@ -55,30 +134,121 @@ class Embed:
     description: str
     timestamp: str
 
+    def to_payload(self) -> dict[str, Any]:
+        """Return the Discord webhook JSON representation of this embed."""
+        posted = datetime.fromisoformat(self.timestamp).strftime("%Y-%m-%d %H:%M UTC")
+        return {
+            "title": self.title,
+            "url": self.url,
+            "description": self.description,
+            "timestamp": self.timestamp,
+            "footer": {"text": f"GitHub Copilot Changelog • {posted}"},
+        }
+
 
-def load_state(path: str = STATE_FILE) -> set[str]:
+def _write_atomic(path: str, data: bytes) -> None:
+    """Write `data` to `path` via a temp file + os.replace so a killed run never leaves a torn file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def load_state(path: str = STATE_FILE, legacy_path: str | None = LEGACY_STATE_FILE) -> set[str]:
+    """Return the ids already posted; the state file holds one id per line."""
     try:
         with open(path, encoding="utf-8") as f:
-            data = json.load(f)
+            return {line for line in f.read().splitlines() if line}
+    except FileNotFoundError:
+        return _load_legacy_state(legacy_path) if legacy_path else set()
+
+
+def _load_legacy_state(path: str) -> set[str]:
+    try:
+        with open(path, "rb") as f:
+            data = orjson.loads(f.read())
         if isinstance(data, list):
             return set(str(x) for x in data)
         return set()
     except FileNotFoundError:
         return set()
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         # Corrupt state; start fresh but don't crash
         return set()
 
 
-def save_state(ids: Iterable[str], path: str = STATE_FILE) -> None:
-    existing = load_state(path)
-    merged = list(existing.union(set(ids)))
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(sorted(merged), f, indent=2)
+def save_state(
+    ids: Iterable[str], path: str = STATE_FILE, legacy_path: str | None = LEGACY_STATE_FILE
+) -> None:
+    """Append newly posted ids to the state file (O(new ids), no rewrite)."""
+    new_ids = [i for i in ids if i]
+    if legacy_path and not os.path.exists(path):
+        # First write after upgrading: carry over the ids from the legacy JSON file
+        new_ids = sorted(_load_legacy_state(legacy_path)) + new_ids
+    if not new_ids:
+        return
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(f"{i}\n" for i in new_ids))
+    if os.path.getsize(path) > STATE_COMPACT_BYTES:
+        compact_state(path)
+
+
+def compact_state(path: str = STATE_FILE, max_ids: int = MAX_SEEN_IDS) -> None:
+    """Rewrite the state file keeping only the `max_ids` most recently appended unique ids."""
+    with open(path, encoding="utf-8") as f:
+        lines = [line for line in f.read().splitlines() if line]
+    newest_first = list(dict.fromkeys(reversed(lines)))[:max_ids]
+    _write_atomic(path, "".join(f"{i}\n" for i in reversed(newest_first)).encode("utf-8"))
+
+
+def load_validators(path: str = VALIDATORS_FILE) -> dict[str, str]:
+    try:
+        with open(path, "rb") as f:
+            data = orjson.loads(f.read())
+        if isinstance(data, dict):
+            return {k: str(v) for k, v in data.items() if k in ("etag", "last_modified") and v}
+        return {}
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return {}
+
+
+def save_validators(validators: dict[str, str], path: str = VALIDATORS_FILE) -> None:
+    _write_atomic(path, orjson.dumps(validators, option=orjson.OPT_INDENT_2))
 
 
-def fetch_feed(url: str = FEED_URL) -> Any:
-    return feedparser.parse(url)
+def fetch_feed(url: str = FEED_URL, validators: dict[str, str] | None = None) -> Any:
+    """Fetch the feed over the shared SESSION and hand the body to feedparser.
+
+    Sends a conditional request when `validators` are given and returns None on
+    304 Not Modified. The response's validators are stored on the result as
+    `etag` / `modified`, like `feedparser.parse(url)` does. HTTP/network failures
+    yield an empty feed rather than raising.
+    """
+    headers = {"User-Agent": feedparser.USER_AGENT}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    try:
+        resp = SESSION.get(url, headers=headers, timeout=FEED_TIMEOUT)
+    except requests.RequestException as exc:
+        print(f"Feed fetch exception: {exc}", file=sys.stderr)
+        return {}
+    if resp.status_code == 304:
+        return None
+    if resp.status_code != 200:
+        print(f"Feed fetch error: {resp.status_code}", file=sys.stderr)
+        return {}
+    # feedparser expects lower-cased header names (used for encoding and base URL detection)
+    response_headers = {k.lower(): v for k, v in resp.headers.items()}
+    response_headers.setdefault("content-location", resp.url)
+    feed = feedparser.parse(resp.content, response_headers=response_headers)
+    if resp.headers.get("ETag"):
+        feed["etag"] = resp.headers["ETag"]
+    if resp.headers.get("Last-Modified"):
+        feed["modified"] = resp.headers["Last-Modified"]
+    return feed
 
 
 def entry_fingerprint(entry: EntryDict) -> str:
@@ -93,21 +263,102 @@ def entry_fingerprint(entry: EntryDict) -> str:
     return str(entry.get("link") or entry.get("title") or "")
 
 
+_llm_cache: dict[str, dict[str, Any]] | None = None
+_llm_cache_dirty = False
+_llm_cache_lock = threading.Lock()
+
+
+def _load_llm_cache(path: str) -> dict[str, dict[str, Any]]:
+    try:
+        with open(path, "rb") as f:
+            data = orjson.loads(f.read())
+        return data if isinstance(data, dict) else {}
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return {}
+
+
+def _save_llm_cache(cache: dict[str, dict[str, Any]], path: str, max_entries: int = LLM_CACHE_MAX_ENTRIES) -> None:
+    # Keep only the newest entries by last-use time so the file cannot grow without bound
+    valid = [(k, v) for k, v in cache.items() if isinstance(v, dict)]
+    newest = sorted(valid, key=lambda kv: kv[1].get("ts") or 0, reverse=True)[:max_entries]
+    _write_atomic(path, orjson.dumps(dict(newest), option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+
+
+def flush_llm_cache() -> None:
+    """Write the LLM cache to disk if it changed since it was loaded or last flushed."""
+    global _llm_cache_dirty
+    with _llm_cache_lock:
+        if _llm_cache is None or not _llm_cache_dirty:
+            return
+        try:
+            _save_llm_cache(_llm_cache, LLM_CACHE_FILE)
+        except OSError as exc:
+            print(f"LLM cache write failed: {exc}", file=sys.stderr)
+            return
+        _llm_cache_dirty = False
+
+
+def llm_cache_key(entry: EntryDict, kind: str) -> str:
+    raw = "\0".join((entry_fingerprint(entry), kind, GITHUB_MODELS_MODEL, PROMPT_VERSION))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+LLMFunc = Callable[[EntryDict, str | None], str | None]
+
+
+def llm_cache(kind: str) -> Callable[[LLMFunc], LLMFunc]:
+    """Cache successful LLM responses on disk, keyed by entry fingerprint + model + prompt version.
+
+    Calls without credentials bypass the cache entirely. Responses are kept in memory
+    until flush_llm_cache() writes them out.
+    """
+
+    def decorator(fn: LLMFunc) -> LLMFunc:
+        @functools.wraps(fn)
+        def wrapper(entry: EntryDict, token: str | None) -> str | None:
+            global _llm_cache, _llm_cache_dirty
+            if not token or not entry_fingerprint(entry):
+                return fn(entry, token)
+            key = llm_cache_key(entry, kind)
+            with _llm_cache_lock:
+                if _llm_cache is None:
+                    _llm_cache = _load_llm_cache(LLM_CACHE_FILE)
+                hit = _llm_cache.get(key)
+                if isinstance(hit, dict) and isinstance(hit.get("value"), str):
+                    # Refresh the last-use time so pruning keeps entries still in the feed
+                    hit["ts"] = int(time.time())
+                    _llm_cache_dirty = True
+                else:
+                    hit = None
+            if hit is not None:
+                if SUMMARY_DEBUG:
+                    print(f"SUMMARY_DEBUG: {kind} from cache", file=sys.stderr)
+                return str(hit["value"])
+            value = fn(entry, token)
+            if value:
+                with _llm_cache_lock:
+                    assert _llm_cache is not None
+                    _llm_cache[key] = {"kind": kind, "value": value, "ts": int(time.time())}
+                    _llm_cache_dirty = True
+            return value
+
+        return wrapper
+
+    return decorator
+
+
 def is_copilot_tagged(entry: EntryDict) -> bool:
     """Return True if entry tags/categories indicate Copilot.
 
     Checks tags (term or label) and category fields, case-insensitive.
     """
-    needles = {"copilot", "github copilot"}
-
-    # tags may be list of dicts with 'term' or 'label' fields
+    # tags may be list of dicts with 'term' or 'label' fields; a substring match also
+    # covers exact values such as "Copilot" / "GitHub Copilot"
     tags = entry.get("tags") or []
     for t in tags:
         for key in ("term", "label"):
-            val = str(t.get(key, ""))
-            if val and val.lower() in needles:
-                return True
-            if "copilot" in val.lower():
+            val = t.get(key)
+            if val and "copilot" in str(val).lower():
                 return True
 
     # Some feeds include 'category' as a single string
@@ -116,28 +367,38 @@ def is_copilot_tagged(entry: EntryDict) -> bool:
         return True
 
     # Title fallback if tags missing (rare, but safe)
-    title = entry.get("title") or ""
-    if isinstance(title, str) and "copilot" in title.lower():
-        return True
-
-    return False
+    title = entry.get("title")
+    return isinstance(title, str) and "copilot" in title.lower()
 
 
 def strip_html(text: str) -> str:
+    # Fast path: plain text has no tags or entities to resolve
+    if "<" not in text and "&" not in text:
+        return text
+    if _HAS_SELECTOLAX:
+        return str(LexborHTMLParser(text).text(separator=" "))
     soup = BeautifulSoup(text, "html.parser")
     return soup.get_text(" ")
 
 
+def _cleaned_summary(entry: EntryDict) -> str:
+    """Return the entry's summary with HTML stripped, computed once per entry."""
+    clean = entry.get("_clean_summary")
+    if clean is None:
+        clean = strip_html(str(entry.get("summary") or ""))
+        entry["_clean_summary"] = clean
+    return clean
+
+
 def basic_summary(entry: EntryDict, max_len: int = 420) -> str:
-    raw = entry.get("summary") or ""
-    clean = strip_html(str(raw)).strip()
+    clean = _cleaned_summary(entry).strip()
     if len(clean) <= max_len:
         return clean
     return clean[: max_len - 1].rstrip() + "…"
 
 
 def build_summary_prompt(entry: EntryDict) -> str:
-    content = strip_html(str(entry.get("summary") or ""))
+    content = _cleaned_summary(entry)
     title = entry.get("title") or ""
     return (
         "Summarize the following GitHub Changelog item about GitHub Copilot into 2-4 concise "
@@ -159,7 +420,7 @@ def build_title_prompt(entry: EntryDict) -> str:
     - no text like 'the post xxx appear first on xxx.'
     - no text like 'Copilot coding agent is our asynchronous, autonomous background agent.'
     """
-    content = strip_html(str(entry.get("summary") or ""))
+    content = _cleaned_summary(entry)
     title = entry.get("title") or ""
     return (
         "Create a concise forum thread title for the following GitHub Copilot changelog item.\n"
@@ -171,162 +432,129 @@ def build_title_prompt(entry: EntryDict) -> str:
     )
 
 
-def openai_llm_bulleted_summary(entry: EntryDict, api_key: str | None) -> str | None:
-    if not api_key:
-        return None
-    try:
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        }
-        body = {
-            "model": "openai/GPT-5",
-            "temperature": 0.2,
-            "messages": [
-                {"role": "system", "content": "You are a concise release note summarizer. You will write direct summaries of the RSS feed content without extra information. Omit text such as 'Copilot coding agent is our asynchronous, autonomous background agent.'."},
-                {"role": "user", "content": build_summary_prompt(entry)},
-            ],
-        }
-        resp = requests.post(
-            "https://api.openai.com/v1/chat/completions", headers=headers, json=body, timeout=SUMMARY_TIMEOUT
-        )
-        if resp.status_code != 200:
-            return None
-        data = resp.json()
-        choice = data.get("choices", [{}])[0]
-        msg = choice.get("message", {}).get("content")
-        if not isinstance(msg, str) or not msg.strip():
-            return None
-        lines = [ln.strip() for ln in msg.strip().splitlines() if ln.strip()]
-        if not lines:
-            return None
-        if len(lines) > 4:
-            lines = lines[:4]
-        return "\n".join(lines)
-    except Exception:
-        return None
+_WS_RE = re.compile(r"\s+")
+_TAIL_PUNCT_RE = re.compile(r"[\s\-–—:.,;!?#]+$")
+_SENTENCE_END_RE = re.compile(r"[.!?]\s|\n")
 
 
 def _clean_title(raw: str, max_len: int = 90) -> str:
+    # strip_html returns plain-text titles (the common case) untouched without parsing
     s = strip_html(raw).strip()
     # Collapse whitespace
-    s = re.sub(r"\s+", " ", s)
+    s = _WS_RE.sub(" ", s)
     # Remove surrounding quotes
     s = s.strip('\'" ')  # handles both single and double quotes and spaces
     # Trim trailing punctuation often added by models
-    s = re.sub(r"[\s\-–—:.,;!?#]+$", "", s)
+    s = _TAIL_PUNCT_RE.sub("", s)
     # Enforce length
     if len(s) > max_len:
         s = s[:max_len].rstrip()
     return s
 
 
-def openai_llm_thread_title(entry: EntryDict, api_key: str | None) -> str | None:
-    if not api_key:
-        return None
+def _postprocess_bullets(msg: str, max_lines: int = 4) -> str | None:
+    """Keep the first `max_lines` non-empty, stripped lines of a model reply."""
+    lines = (stripped for ln in msg.splitlines() if (stripped := ln.strip()))
+    return "\n".join(itertools.islice(lines, max_lines)) or None
+
+
+def _parse_title(msg: str) -> str | None:
+    title = _clean_title(msg)
+    return title or None
+
+
+def _llm_call(
+    *,
+    endpoint: str,
+    token: str,
+    model: str,
+    system_prompt: str,
+    prompt: str,
+    parse: Callable[[str], str | None],
+    extra_headers: dict[str, str] | None = None,
+) -> str | None:
+    """POST a chat completion and return the parsed reply, or None on any failure."""
     try:
         headers = {
-            "Authorization": f"Bearer {api_key}",
+            "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
+            **(extra_headers or {}),
         }
         body = {
-            "model": "openai/gpt-5-mini",
+            "model": model,
             "temperature": 0.2,
             "messages": [
-                {"role": "system", "content": "You are a helpful assistant that writes brief titles."},
-                {"role": "user", "content": build_title_prompt(entry)},
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
             ],
         }
-        resp = requests.post(
-            "https://api.openai.com/v1/chat/completions", headers=headers, json=body, timeout=SUMMARY_TIMEOUT
-        )
+        resp = SESSION.post(endpoint, headers=headers, data=orjson.dumps(body), timeout=SUMMARY_TIMEOUT)
         if resp.status_code != 200:
             return None
-        data = resp.json()
+        data = orjson.loads(resp.content)
         choice = data.get("choices", [{}])[0]
         msg = choice.get("message", {}).get("content")
         if not isinstance(msg, str) or not msg.strip():
             return None
-        title = _clean_title(msg)
-        return title or None
+        return parse(msg)
     except Exception:
         return None
 
 
+def openai_llm_bulleted_summary(entry: EntryDict, api_key: str | None) -> str | None:
+    if not api_key:
+        return None
+    return _llm_call(
+        endpoint=OPENAI_API_URL,
+        token=api_key,
+        model="openai/GPT-5",
+        system_prompt=OPENAI_SUMMARY_SYSTEM_PROMPT,
+        prompt=build_summary_prompt(entry),
+        parse=_postprocess_bullets,
+    )
+
+
+def openai_llm_thread_title(entry: EntryDict, api_key: str | None) -> str | None:
+    if not api_key:
+        return None
+    return _llm_call(
+        endpoint=OPENAI_API_URL,
+        token=api_key,
+        model="openai/gpt-5-mini",
+        system_prompt=TITLE_SYSTEM_PROMPT,
+        prompt=build_title_prompt(entry),
+        parse=_parse_title,
+    )
+
+
+@llm_cache("summary")
 def github_llm_bulleted_summary(entry: EntryDict, token: str | None) -> str | None:
     if not token:
         return None
-    try:
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "X-GitHub-Api-Version": "2024-07-01",
-        }
-        body = {
-            "model": GITHUB_MODELS_MODEL,
-            "temperature": 0.2,
-            "messages": [
-                {"role": "system", "content": "You are a concise release note summarizer."},
-                {"role": "user", "content": build_summary_prompt(entry)},
-            ],
-        }
-        resp = requests.post(
-            GITHUB_MODELS_API_URL,
-            headers=headers,
-            json=body,
-            timeout=SUMMARY_TIMEOUT,
-        )
-        if resp.status_code != 200:
-            return None
-        data = resp.json()
-        choice = data.get("choices", [{}])[0]
-        msg = choice.get("message", {}).get("content")
-        if not isinstance(msg, str) or not msg.strip():
-            return None
-        lines = [ln.strip() for ln in msg.strip().splitlines() if ln.strip()]
-        if not lines:
-            return None
-        if len(lines) > 4:
-            lines = lines[:4]
-        return "\n".join(lines)
-    except Exception:
-        return None
+    return _llm_call(
+        endpoint=GITHUB_MODELS_API_URL,
+        token=token,
+        model=GITHUB_MODELS_MODEL,
+        system_prompt=SUMMARY_SYSTEM_PROMPT,
+        prompt=build_summary_prompt(entry),
+        parse=_postprocess_bullets,
+        extra_headers=GITHUB_MODELS_HEADERS,
+    )
 
 
+@llm_cache("title")
 def github_llm_thread_title(entry: EntryDict, token: str | None) -> str | None:
     if not token:
         return None
-    try:
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "X-GitHub-Api-Version": "2024-07-01",
-        }
-        body = {
-            "model": GITHUB_MODELS_MODEL,
-            "temperature": 0.2,
-            "messages": [
-                {"role": "system", "content": "You are a helpful assistant that writes brief titles."},
-                {"role": "user", "content": build_title_prompt(entry)},
-            ],
-        }
-        resp = requests.post(
-            GITHUB_MODELS_API_URL,
-            headers=headers,
-            json=body,
-            timeout=SUMMARY_TIMEOUT,
-        )
-        if resp.status_code != 200:
-            return None
-        data = resp.json()
-        choice = data.get("choices", [{}])[0]
-        msg = choice.get("message", {}).get("content")
-        if not isinstance(msg, str) or not msg.strip():
-            return None
-        title = _clean_title(msg)
-        return title or None
-    except Exception:
-        return None
+    return _llm_call(
+        endpoint=GITHUB_MODELS_API_URL,
+        token=token,
+        model=GITHUB_MODELS_MODEL,
+        system_prompt=TITLE_SYSTEM_PROMPT,
+        prompt=build_title_prompt(entry),
+        parse=_parse_title,
+        extra_headers=GITHUB_MODELS_HEADERS,
+    )
 
 
 def summarize_entry(entry: EntryDict) -> str:
@@ -371,7 +599,7 @@ def derive_thread_name(entry: EntryDict) -> str:
     # Last resort: derive from basic summary first sentence/phrase
     bs = basic_summary(entry, max_len=90)
     # Take up to first sentence or 8 words
-    first = re.split(r"[.!?]\s|\n", bs, maxsplit=1)[0]
+    first = _SENTENCE_END_RE.split(bs, maxsplit=1)[0]
     words = first.split()
     if len(words) > 10:
         first = " ".join(words[:10])
@@ -379,19 +607,25 @@ def derive_thread_name(entry: EntryDict) -> str:
 
 
 def entry_datetime_utc(entry: EntryDict) -> datetime:
-    # Prefer published, else now
+    # Prefer feedparser's pre-parsed (UTC) published time, then the raw string, else now
     ts: datetime | None = None
-    if entry.get("published"):
-        try:
-            ts = dateparser.parse(str(entry["published"]))
-        except Exception:
-            ts = None
-    if ts is None and entry.get("published_parsed") is not None:
+    if entry.get("published_parsed") is not None:
         try:
             # feedparser can give time.struct_time
             ts = datetime(*entry["published_parsed"][:6])
         except Exception:
             ts = None
+    if ts is None and entry.get("published"):
+        raw = str(entry["published"])
+        try:
+            # RSS feeds use RFC 822 dates, e.g. "Tue, 14 Oct 2025 17:00:00 +0000"
+            ts = parsedate_to_datetime(raw)
+        except (TypeError, ValueError):
+            try:
+                # Atom feeds use ISO 8601
+                ts = datetime.fromisoformat(raw)
+            except ValueError:
+                ts = None
     if ts is None:
         ts = datetime.now(timezone.utc)
     if ts.tzinfo is None:
@@ -399,7 +633,7 @@ def entry_datetime_utc(entry: EntryDict) -> datetime:
     return ts.astimezone(timezone.utc)
 
 
-def to_discord_embed(entry: EntryDict, use_ai: bool = True) -> Embed:
+def to_discord_embed(entry: EntryDict, use_ai: bool = True, dt: datetime | None = None) -> Embed:
     title = str(entry.get("title", "GitHub Changelog"))
     url = str(entry.get("link", "https://github.blog/changelog/"))
     if use_ai:
@@ -407,59 +641,86 @@ def to_discord_embed(entry: EntryDict, use_ai: bool = True) -> Embed:
     else:
         description = basic_summary(entry)
 
-    dt = entry_datetime_utc(entry)
+    if dt is None:
+        dt = entry_datetime_utc(entry)
     ts = dt.isoformat()
     return Embed(title=title, url=url, description=description, timestamp=ts)
 
 
-def post_to_discord(embeds: Sequence[Embed], thread_name: str | None = None) -> tuple[bool, int | None]:
+def build_posts(
+    entries: Sequence[EntryDict],
+    use_ai: bool = True,
+    published: Sequence[datetime] | None = None,
+    titled: int = 0,
+) -> tuple[list[Embed], list[str]]:
+    """Build embeds for `entries` plus thread names for the first `titled` of them.
+
+    Summaries and titles are independent (I/O-bound) LLM calls, so they all run
+    concurrently. `published` optionally carries the already-parsed timestamp of
+    each entry. Results are returned in the same order as `entries`.
+    """
+    dts: Sequence[datetime | None] = published if published is not None else [None] * len(entries)
+    to_title = entries[:titled]
+    if len(entries) + len(to_title) <= 1:
+        embeds = [to_discord_embed(e, use_ai=use_ai, dt=dt) for e, dt in zip(entries, dts, strict=True)]
+        titles = [derive_thread_name(e) for e in to_title]
+    else:
+        workers = min(LLM_MAX_CONCURRENCY, len(entries) + len(to_title))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            embed_futures = [
+                pool.submit(to_discord_embed, e, use_ai=use_ai, dt=dt)
+                for e, dt in zip(entries, dts, strict=True)
+            ]
+            title_futures = [pool.submit(derive_thread_name, e) for e in to_title]
+            embeds = [f.result() for f in embed_futures]
+            titles = [f.result() for f in title_futures]
+    # One cache write per run instead of one per LLM response
+    flush_llm_cache()
+    return embeds, titles
+
+
+def discord_webhook_url(base: str) -> str:
+    """Return the webhook URL, appending thread_id for forum channels when provided."""
+    if not DISCORD_THREAD_ID:
+        return base
+    sep = "&" if "?" in base else "?"
+    return f"{base}{sep}thread_id={DISCORD_THREAD_ID}"
+
+
+def post_to_discord(
+    embeds: Sequence[Embed], thread_name: str | None = None, url: str | None = None
+) -> tuple[bool, int | None]:
+    """POST embeds to the webhook; `url` is the precomputed discord_webhook_url() for repeated calls."""
     if not DISCORD_WEBHOOK_URL:
         print("Missing DISCORD_WEBHOOK_URL env var", file=sys.stderr)
         return False, None
     if not embeds:
         return True, None
 
-    # Append thread_id for forum channels when provided
-    url = DISCORD_WEBHOOK_URL
-    if DISCORD_THREAD_ID:
-        sep = "&" if "?" in url else "?"
-        url = f"{url}{sep}thread_id={DISCORD_THREAD_ID}"
-
-    payload: dict[str, Any] = {
-        "content": None,
-        "embeds": [
-            {
-                "title": e.title,
-                "url": e.url,
-                "description": e.description,
-                "timestamp": e.timestamp,
-                "footer": {
-                    "text": f"GitHub Copilot Changelog • {datetime.fromisoformat(e.timestamp).strftime('%Y-%m-%d %H:%M UTC')}"
-                },
-            }
-            for e in embeds
-        ],
-    }
+    url = url or discord_webhook_url(DISCORD_WEBHOOK_URL)
+    payload: dict[str, Any] = {"content": None, "embeds": [e.to_payload() for e in embeds]}
     # For forum channels, you can create a thread on-the-fly by passing thread_name
     chosen_thread_name = thread_name or (DISCORD_THREAD_NAME or None)
     if chosen_thread_name and not DISCORD_THREAD_ID:
         payload["thread_name"] = chosen_thread_name
     if DRY_RUN:
         try:
-            print(json.dumps({"url": url, **payload}, indent=2))
+            print(orjson.dumps({"url": url, **payload}, option=orjson.OPT_INDENT_2).decode())
         except Exception:
             print("DRY_RUN: (payload not JSON-serializable)")
         print("DRY_RUN: skipping Discord webhook post", file=sys.stderr)
         return True, None
     try:
-        r = requests.post(url, json=payload, timeout=20)
+        r = SESSION.post(
+            url, headers={"Content-Type": "application/json"}, data=orjson.dumps(payload), timeout=20
+        )
         if 200 <= r.status_code < 300:
             return True, None
         # Helpful hint for forum channel error code 220001
         hint = ""
         err_code: int | None = None
         try:
-            err = r.json()
+            err = orjson.loads(r.content)
             if isinstance(err, dict):
                 err_code = err.get("code") if isinstance(err.get("code"), int) else None
                 if err_code == 220001:
@@ -481,44 +742,78 @@ def main() -> int:
         print("DISCORD_WEBHOOK_URL is required.", file=sys.stderr)
         return 1
 
-    feed = fetch_feed(FEED_URL)
-    entries: list[EntryDict] = [EntryDict(**e) for e in feed.get("entries", [])]
+    # A forced run must see the whole feed, so it never sends a conditional request
+    validators = {} if FORCE_POST else load_validators(VALIDATORS_FILE)
+    feed = fetch_feed(FEED_URL, validators)
+    if feed is None:
+        # 304 Not Modified: nothing changed since the last successful run
+        return 0
+
+    rc, drained = process_feed(feed)
+    # Only remember the validators once every new entry was posted and recorded,
+    # otherwise a failed or capped run would be skipped by the next 304.
+    if rc == 0 and drained and not FORCE_POST:
+        new_validators = {"etag": feed.get("etag"), "last_modified": feed.get("modified")}
+        new_validators = {k: v for k, v in new_validators.items() if v}
+        # A failed fetch yields an empty feed without validators; keep the saved ones
+        if new_validators:
+            save_validators(new_validators, VALIDATORS_FILE)
+    return rc
+
+
+def process_feed(feed: Any) -> tuple[int, bool]:
+    """Post new Copilot entries from a parsed feed and record them.
+
+    Returns the exit code and whether every pending entry was handled, i.e. the
+    run was not cut short by MAX_ITEMS_PER_RUN.
+    """
+    # feedparser entries are dicts already, so they are used as-is rather than copied
+    entries: list[EntryDict] = feed.get("entries") or []
     if not entries:
         # Nothing to do
-        return 0
+        return 0, True
 
-    seen = load_state(STATE_FILE)
+    seen: set[str] = set() if FORCE_POST else load_state(STATE_FILE)
 
     # Filter copilot-tagged and unseen
-    filtered: list[EntryDict] = []
-    for e in entries:
-        if not is_copilot_tagged(e):
-            continue
-        eid = entry_fingerprint(e)
-        if not eid:
-            continue
-        if not FORCE_POST and eid in seen:
-            continue
-        filtered.append(e)
-
+    filtered: list[EntryDict] = [
+        e for e in entries if is_copilot_tagged(e) and (eid := entry_fingerprint(e)) and eid not in seen
+    ]
     if not filtered:
-        return 0
+        return 0, True
+
+    # Parse each timestamp once; reused for ordering and the embeds
+    published = {id(e): entry_datetime_utc(e) for e in filtered}
 
     # Oldest -> newest for reading order
-    filtered.sort(key=lambda x: entry_datetime_utc(x))
+    filtered.sort(key=lambda x: published[id(x)])
 
-    # Safety cap
+    # Safety cap; anything beyond it stays unseen for the next run
     to_send = filtered[:MAX_ITEMS_PER_RUN]
+    return post_entries(to_send, published), len(filtered) <= MAX_ITEMS_PER_RUN
 
+
+def post_entries(to_send: Sequence[EntryDict], published: dict[int, datetime]) -> int:
+    """Post entries according to the forum mode and record the posted ids; returns the exit code."""
     # Respect explicit thread envs first
     explicit_thread = bool(DISCORD_THREAD_ID or DISCORD_THREAD_NAME)
 
     # Determine behavior by mode
     mode = DISCORD_FORUM_MODE
-    embeds = [to_discord_embed(e) for e in to_send]
+    # Thread names needed: none with an explicit thread or "off", one per item for
+    # "per-item", else (single/auto) one for the first item
+    if explicit_thread or mode == "off":
+        titled = 0
+    elif mode == "per-item":
+        titled = len(to_send)
+    else:
+        titled = 1
+    embeds, thread_titles = build_posts(to_send, published=[published[id(e)] for e in to_send], titled=titled)
+    # Build the webhook URL (with the optional thread_id query) once for every post below
+    url = discord_webhook_url(DISCORD_WEBHOOK_URL) if DISCORD_WEBHOOK_URL else None
 
     if explicit_thread:
-        ok, _ = post_to_discord(embeds)
+        ok, _ = post_to_discord(embeds, url=url)
         if ok:
             if not FORCE_POST:
                 ids = [entry_fingerprint(e) for e in to_send]
@@ -529,10 +824,8 @@ def main() -> int:
     if mode == "per-item":
         all_ok = True
         posted_ids: list[str] = []
-        for entry in to_send:
-            embed = to_discord_embed(entry)
-            thread_title = derive_thread_name(entry)
-            ok_one, _ = post_to_discord([embed], thread_name=thread_title)
+        for entry, embed, thread_title in zip(to_send, embeds, thread_titles, strict=True):
+            ok_one, _ = post_to_discord([embed], thread_name=thread_title, url=url)
             if ok_one:
                 posted_ids.append(entry_fingerprint(entry))
             else:
@@ -543,8 +836,7 @@ def main() -> int:
 
     if mode == "single":
         # Use a single derived title for the batch
-        thread_title = derive_thread_name(to_send[0])
-        ok, _ = post_to_discord(embeds, thread_name=thread_title)
+        ok, _ = post_to_discord(embeds, thread_name=thread_titles[0], url=url)
         if ok:
             if not FORCE_POST:
                 ids = [entry_fingerprint(e) for e in to_send]
@@ -554,7 +846,7 @@ def main() -> int:
 
     if mode == "off":
         # Just try batch; do not auto-fallback to per-item
-        ok, _ = post_to_discord(embeds)
+        ok, _ = post_to_discord(embeds, url=url)
         if ok:
             if not FORCE_POST:
                 ids = [entry_fingerprint(e) for e in to_send]
@@ -564,8 +856,7 @@ def main() -> int:
 
     # auto (default): first try creating a single thread with an AI-derived title;
     # if that fails (e.g., not a forum channel), fallback to posting each item without thread names.
-    thread_title = derive_thread_name(to_send[0])
-    ok, _ = post_to_discord(embeds, thread_name=thread_title)
+    ok, _ = post_to_discord(embeds, thread_name=thread_titles[0], url=url)
     if ok:
         if not FORCE_POST:
             ids = [entry_fingerprint(e) for e in to_send]
@@ -574,9 +865,8 @@ def main() -> int:
     # Fallback: per-item, no thread_name
     all_ok = True
     posted_ids = []
-    for entry in to_send:
-        embed = to_discord_embed(entry)
-        ok_one, _ = post_to_discord([embed])
+    for entry, embed in zip(to_send, embeds, strict=True):
+        ok_one, _ = post_to_discord([embed], url=url)
         if ok_one:
             posted_ids.append(entry_fingerprint(entry))
         else:
@@ -0,0 +1,42 @@
+import importlib
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+# Make the top-level script importable as a regular module
+_ROOT = str(Path(__file__).resolve().parents[1])
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+
+def _load_module() -> Any:
+    # import_module caches in sys.modules, so repeat calls are a dict lookup
+    return importlib.import_module("copilot_changelog_to_discord")
+
+
+@pytest.fixture(scope="session")
+def mod() -> Any:
+    """The script module, loaded once and shared by every test.
+
+    Tests that change module globals must use `monkeypatch` so nothing leaks between tests.
+    """
+    return _load_module()
+
+
+@pytest.fixture
+def no_llm(mod: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Clear LLM credentials so summaries and titles take the non-AI fallbacks."""
+    monkeypatch.setattr(mod, "GITHUB_MODELS_TOKEN", None)
+    monkeypatch.setattr(mod, "OPENAI_API_KEY", None)
+
+
+@pytest.fixture
+def tmp_llm_cache(mod: Any, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Point the LLM cache at an empty file under tmp_path and reset its in-memory state."""
+    path = tmp_path / "llm_cache.json"
+    monkeypatch.setattr(mod, "LLM_CACHE_FILE", str(path))
+    monkeypatch.setattr(mod, "_llm_cache", None)
+    monkeypatch.setattr(mod, "_llm_cache_dirty", False)
+    return path
@@ -1,77 +1,227 @@
-import importlib.util
-import sys
 from pathlib import Path
 from typing import Any
 
+import pytest
 
-def _load_module() -> Any:
-    root = Path(__file__).resolve().parents[1]
-    module_path = root / "copilot_changelog_to_discord.py"
-    spec = importlib.util.spec_from_file_location("copilot_changelog_to_discord", module_path)
-    assert spec and spec.loader
-    mod = importlib.util.module_from_spec(spec)
-    sys.modules[spec.name] = mod  # ensure module is visible during dataclass processing
-    spec.loader.exec_module(mod)
-    return mod
+# Shared sample entries. The summary helpers memoize cleaned text on the entry
+# dict, so tests calling them pass a copy (dict(...)) to keep these pristine.
+_ENTRY_TAG_TERM: dict[str, Any] = {"title": "Update", "tags": ({"term": "Copilot"},)}
+_ENTRY_CATEGORY: dict[str, Any] = {"title": "Update", "category": "GitHub Copilot"}
+_ENTRY_LONG_SUMMARY: dict[str, Any] = {"summary": f"<p>{'x' * 1000}</p>"}
+_ENTRY_SUMMARY_ONLY: dict[str, Any] = {"summary": "<p>Copilot improvements to code search.</p>"}
+_ENTRY_WITH_TITLE: dict[str, Any] = {
+    "title": "Copilot: Improved inline completions",
+    "summary": "<p>Inline completion quality enhancements and latency reduction.</p>",
+}
+_ENTRY_NO_TITLE: dict[str, Any] = {
+    "summary": "<p>Fixes for Copilot chat rendering with markdown code blocks.</p>",
+}
 
 
-def test_is_copilot_tagged_by_tag_term() -> None:
-    mod = _load_module()
-    entry: dict[str, Any] = {
-        "title": "Update",
-        "tags": [{"term": "Copilot"}],
-    }
+@pytest.mark.parametrize("entry", [_ENTRY_TAG_TERM, _ENTRY_CATEGORY], ids=["tag-term", "category"])
+def test_is_copilot_tagged(mod: Any, entry: dict[str, Any]) -> None:
     assert mod.is_copilot_tagged(entry) is True
 
 
-def test_is_copilot_tagged_by_category() -> None:
-    mod = _load_module()
-    entry: dict[str, Any] = {
-        "title": "Update",
-        "category": "GitHub Copilot",
-    }
-    assert mod.is_copilot_tagged(entry) is True
-
-
-def test_basic_summary_truncates() -> None:
-    mod = _load_module()
-    entry: dict[str, Any] = {
-        "summary": "<p>" + ("x" * 1000) + "</p>",
-    }
-    s = mod.basic_summary(entry, max_len=100)
+def test_basic_summary_truncates(mod: Any) -> None:
+    s = mod.basic_summary(dict(_ENTRY_LONG_SUMMARY), max_len=100)
     assert len(s) <= 100
 
 
-def test_summarize_entry_falls_back_to_basic_summary() -> None:
-    mod = _load_module()
-    mod.GITHUB_MODELS_TOKEN = None
-    mod.OPENAI_API_KEY = None
-    entry: dict[str, Any] = {
-        "summary": "<p>Copilot improvements to code search.</p>",
-    }
-    summary = mod.summarize_entry(entry)
+@pytest.mark.usefixtures("no_llm")
+def test_summarize_entry_falls_back_to_basic_summary(mod: Any) -> None:
+    summary = mod.summarize_entry(dict(_ENTRY_SUMMARY_ONLY))
     assert "Copilot improvements to code search." in summary
 
 
-def test_derive_thread_name_falls_back_to_entry_title() -> None:
-    mod = _load_module()
-    mod.GITHUB_MODELS_TOKEN = None
-    mod.OPENAI_API_KEY = None
-    entry: dict[str, Any] = {
-        "title": "Copilot: Improved inline completions",
-        "summary": "<p>Inline completion quality enhancements and latency reduction.</p>",
-    }
-    name = mod.derive_thread_name(entry)
+@pytest.mark.usefixtures("no_llm")
+def test_derive_thread_name_falls_back_to_entry_title(mod: Any) -> None:
+    name = mod.derive_thread_name(dict(_ENTRY_WITH_TITLE))
     assert isinstance(name, str) and len(name) > 0
     assert "Copilot" in name
 
 
-def test_derive_thread_name_from_summary_when_no_title() -> None:
-    mod = _load_module()
-    mod.GITHUB_MODELS_TOKEN = None
-    mod.OPENAI_API_KEY = None
-    entry: dict[str, Any] = {
-        "summary": "<p>Fixes for Copilot chat rendering with markdown code blocks.</p>",
-    }
-    name = mod.derive_thread_name(entry)
+@pytest.mark.usefixtures("no_llm")
+def test_derive_thread_name_from_summary_when_no_title(mod: Any) -> None:
+    name = mod.derive_thread_name(dict(_ENTRY_NO_TITLE))
     assert isinstance(name, str) and len(name) > 0
+
+
+@pytest.mark.usefixtures("no_llm")
+def test_build_posts_preserves_entry_order(mod: Any) -> None:
+    entries: list[dict[str, Any]] = [
+        {"title": f"Copilot update {i}", "summary": f"<p>Change {i}</p>", "published": "2025-01-01T00:00:00Z"}
+        for i in range(4)
+    ]
+    embeds, titles = mod.build_posts(entries)
+    assert titles == []
+    assert [e.title for e in embeds] == [f"Copilot update {i}" for i in range(4)]
+    assert [e.description for e in embeds] == [f"Change {i}" for i in range(4)]
+
+
+@pytest.mark.usefixtures("tmp_llm_cache")
+def test_llm_cache_reuses_response_from_disk(mod: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[str] = []
+
+    @mod.llm_cache("summary")
+    def fake_llm(entry: dict[str, Any], token: str | None) -> str | None:
+        calls.append(entry["id"])
+        return "- cached bullet"
+
+    entry: dict[str, Any] = {"id": "tag:github.blog,1", "summary": "<p>Copilot</p>"}
+    assert fake_llm(entry, "token") == "- cached bullet"
+    mod.flush_llm_cache()
+    monkeypatch.setattr(mod, "_llm_cache", None)  # force a reload from disk
+    assert fake_llm(entry, "token") == "- cached bullet"
+    assert calls == ["tag:github.blog,1"]
+    # Without credentials the cache is bypassed
+    fake_llm(entry, None)
+    assert len(calls) == 2
+
+
+def test_save_llm_cache_keeps_most_recently_used_entries(mod: Any, tmp_path: Path) -> None:
+    path = str(tmp_path / "llm_cache.json")
+    cache = {f"k{ts}": {"kind": "summary", "value": "v", "ts": ts} for ts in (3, 1, 2)}
+    mod._save_llm_cache(cache, path, max_entries=2)
+    assert set(mod._load_llm_cache(path)) == {"k3", "k2"}
+
+
+def test_entry_datetime_utc_parses_rfc822_and_iso(mod: Any) -> None:
+    rfc822 = mod.entry_datetime_utc({"published": "Tue, 14 Oct 2025 13:00:00 -0400"})
+    iso = mod.entry_datetime_utc({"published": "2025-10-14T17:00:00Z"})
+    assert rfc822.isoformat() == "2025-10-14T17:00:00+00:00"
+    assert iso == rfc822
+
+
+def test_save_state_appends_and_migrates_legacy_ids(mod: Any, tmp_path: Path) -> None:
+    path = str(tmp_path / "seen.txt")
+    legacy = tmp_path / "seen.json"
+    legacy.write_text('["old-1", "old-2"]', encoding="utf-8")
+
+    assert mod.load_state(path, legacy_path=str(legacy)) == {"old-1", "old-2"}
+    mod.save_state(["new-1"], path, legacy_path=str(legacy))
+    mod.save_state(["new-2"], path, legacy_path=str(legacy))
+    assert Path(path).read_text(encoding="utf-8").splitlines() == ["old-1", "old-2", "new-1", "new-2"]
+
+    mod.compact_state(path, max_ids=2)
+    assert mod.load_state(path) == {"new-1", "new-2"}
+
+
+@pytest.mark.usefixtures("no_llm")
+def test_main_keeps_validators_until_backlog_is_drained(
+    mod: Any, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(mod, "DISCORD_WEBHOOK_URL", "https://discord.com/api/webhooks/1/x")
+    monkeypatch.setattr(mod, "DISCORD_THREAD_ID", None)
+    monkeypatch.setattr(mod, "DISCORD_THREAD_NAME", None)
+    monkeypatch.setattr(mod, "DISCORD_FORUM_MODE", "off")
+    monkeypatch.setattr(mod, "DRY_RUN", True)
+    monkeypatch.setattr(mod, "FORCE_POST", False)
+    monkeypatch.setattr(mod, "MAX_ITEMS_PER_RUN", 2)
+    entries = [{**_ENTRY_TAG_TERM, "id": f"e{i}"} for i in range(3)]
+    monkeypatch.setattr(mod, "fetch_feed", lambda url, validators=None: {"entries": entries, "etag": '"v1"'})
+
+    # The cap leaves one entry behind, so a 304 must not hide it from the next run
+    assert mod.main() == 0
+    assert not (tmp_path / mod.VALIDATORS_FILE).exists()
+    assert mod.load_state(mod.STATE_FILE) == {"e0", "e1"}
+
+    assert mod.main() == 0
+    assert mod.load_validators(mod.VALIDATORS_FILE) == {"etag": '"v1"'}
+    assert mod.load_state(mod.STATE_FILE) == {"e0", "e1", "e2"}
+
+
+@pytest.mark.usefixtures("no_llm")
+def test_post_entries_builds_webhook_url_once(mod: Any, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(mod, "DISCORD_WEBHOOK_URL", "https://discord.com/api/webhooks/1/x")
+    monkeypatch.setattr(mod, "DISCORD_THREAD_ID", None)
+    monkeypatch.setattr(mod, "DISCORD_THREAD_NAME", None)
+    monkeypatch.setattr(mod, "DISCORD_FORUM_MODE", "per-item")
+    monkeypatch.setattr(mod, "DRY_RUN", True)
+    monkeypatch.setattr(mod, "FORCE_POST", False)
+    calls: list[str] = []
+
+    def fake_webhook_url(base: str) -> str:
+        calls.append(base)
+        return base
+
+    monkeypatch.setattr(mod, "discord_webhook_url", fake_webhook_url)
+    entries = [{**_ENTRY_TAG_TERM, "id": f"e{i}"} for i in range(3)]
+    published = {id(e): mod.entry_datetime_utc(e) for e in entries}
+
+    # One webhook post per entry, but the URL is only built once
+    assert mod.post_entries(entries, published) == 0
+    assert calls == ["https://discord.com/api/webhooks/1/x"]
+    assert mod.load_state(mod.STATE_FILE) == {"e0", "e1", "e2"}
+
+
+def test_main_keeps_validators_when_fetch_fails(mod: Any, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(mod, "DISCORD_WEBHOOK_URL", "https://discord.com/api/webhooks/1/x")
+    monkeypatch.setattr(mod, "FORCE_POST", False)
+    mod.save_validators({"etag": '"v1"'}, mod.VALIDATORS_FILE)
+    # fetch_feed returns an empty feed on network errors and non-200 responses
+    monkeypatch.setattr(mod, "fetch_feed", lambda url, validators=None: {})
+
+    assert mod.main() == 0
+    assert mod.load_validators(mod.VALIDATORS_FILE) == {"etag": '"v1"'}
+
+
+@pytest.mark.parametrize(
+    ("url", "retries_5xx"),
+    [
+        ("https://discord.com/api/webhooks/1/x", False),
+        ("https://ptb.discord.com/api/webhooks/1/x", False),
+        ("https://canary.discord.com/api/webhooks/1/x", False),
+        ("https://api.openai.com/v1/chat/completions", True),
+        ("https://github.blog/changelog/feed/", True),
+    ],
+)
+def test_session_retries_gateway_errors_only_for_idempotent_endpoints(
+    mod: Any, url: str, retries_5xx: bool
+) -> None:
+    status_forcelist = mod.SESSION.get_adapter(url).max_retries.status_forcelist
+    assert 429 in status_forcelist
+    assert (503 in status_forcelist) is retries_5xx
+
+
+@pytest.mark.parametrize("url", ["https://api.openai.com/v1/chat/completions", "https://github.blog/changelog/feed/"])
+def test_session_ignores_retry_after_for_feed_and_llm(mod: Any, url: str) -> None:
+    assert mod.SESSION.get_adapter(url).max_retries.respect_retry_after_header is False
+
+
+@pytest.mark.usefixtures("tmp_llm_cache")
+def test_github_llm_summary_parses_chat_completion(mod: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    sent: dict[str, Any] = {}
+
+    class FakeResponse:
+        status_code = 200
+        content = b'{"choices": [{"message": {"content": "- a\\n\\n- b\\n- c\\n- d\\n- e"}}]}'
+
+    def fake_post(url: str, **kwargs: Any) -> FakeResponse:
+        sent.update(kwargs, url=url)
+        return FakeResponse()
+
+    monkeypatch.setattr(mod.SESSION, "post", fake_post)
+    summary = mod.github_llm_bulleted_summary({"id": "e1", "summary": "<p>Copilot</p>"}, "token")
+    assert summary == "- a\n- b\n- c\n- d"
+    assert sent["url"] == mod.GITHUB_MODELS_API_URL
+    assert sent["headers"]["X-GitHub-Api-Version"] == "2024-07-01"
+    assert sent["headers"]["Content-Type"] == "application/json"
+
+
+@pytest.mark.usefixtures("no_llm")
+def test_build_posts_derives_titles_for_first_entries(mod: Any) -> None:
+    entries: list[dict[str, Any]] = [
+        {"title": f"Copilot update {i}.", "summary": f"<p>{i}</p>"} for i in range(3)
+    ]
+    embeds, titles = mod.build_posts(entries, titled=2)
+    assert len(embeds) == 3
+    assert titles == ["Copilot update 0", "Copilot update 1"]
+
+
+def test_postprocess_bullets_keeps_first_four_lines(mod: Any) -> None:
+    assert mod._postprocess_bullets("\n- a \n\n- b\n- c\n- d\n- e\n") == "- a\n- b\n- c\n- d"
+    assert mod._postprocess_bullets(" \n \n") is None